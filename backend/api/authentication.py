@@ -0,0 +1,96 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+class CacheStats:
+    """Попадания и промахи кэша токенов в текущем процессе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+
+token_cache_stats = CacheStats()
+
+
+# Поля пользователя, которые читают права доступа и вьюхи. Пароль и сам
+# токен в кэш не попадают: остальные поля догружаются из базы при обращении.
+CACHED_USER_FIELDS = (
+    "id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+def token_cache_key(key):
+    # ключ — хэш токена, чтобы секрет не лежал в кэше и в именах ключей
+    return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_tokens(*keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который берёт пользователя из кэша.
+
+    В кэше лежат только CACHED_USER_FIELDS; пользователь собирается из них
+    с отложенными остальными полями, так что пароль читается из базы лишь
+    при обращении, а save() пишет только загруженные поля. Запись живёт
+    AUTH_TOKEN_CACHE_TIMEOUT секунд и удаляется сигналами при выходе,
+    удалении токена и сохранении пользователя. С локальным кэшем другие
+    процессы узнают об этом только по истечении срока.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        values = cache.get(cache_key)
+        token_cache_stats.record(values is not None)
+        if values is None:
+            user, token = super().authenticate_credentials(key)
+            values = {
+                field: getattr(user, field) for field in CACHED_USER_FIELDS
+            }
+            cache.set(cache_key, values, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            return user, token
+        # from_db ждёт значения в порядке полей модели
+        fields = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in values
+        ]
+        user = User.from_db(
+            "default", fields, [values[field] for field in fields]
+        )
+        token = Token.from_db("default", ("key", "user_id"), (key, user.pk))
+        token.user = user
+        return user, token
@@ -1,27 +1,75 @@
+import csv
 
 from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import api_view
 
 from recipes import models
 
+FILENAME = "shopping_list"
+FILE_FORMAT_PARAM = "file_format"
 
-@api_view(['GET'])
-def download_shopping_cart(request):
-    ingredient_list = "Корзина:"
-    ingredients = models.Ingredient.objects.filter(
-        recipe__shopping_cart__user=request.user
-    ).values(
-        'ingredient__name', 'ingredient__measurement_unit'
-    ).annotate(amount=Sum('amount'))
-    for num, i in enumerate(ingredients):
-        ingredient_list += (
-            f"\n{i['ingredient__name']} - "
-            f"{i['amount']} {i['ingredient__measurement_unit']}"
+
+class Echo:
+    """Псевдо-файл: csv.writer пишет строку и сразу получает её обратно."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    """Сумма ингредиентов по всем рецептам корзины одним GROUP BY."""
+    return (
+        models.RecipeIngredients.objects.filter(recipe__cart__user=user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(amount=Sum("amount"))
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+    )
+
+
+def stream_txt(ingredients):
+    yield "Корзина:\n"
+    for item in ingredients.iterator():
+        yield (
+            f"{item['ingredient__name']} "
+            f"({item['ingredient__measurement_unit']}) — {item['amount']}\n"
         )
-        if num < ingredients.count() - 1:
-            ingredient_list += ', '
-    file = 'shopping_list'
-    response = HttpResponse(ingredient_list, 'Content-Type: application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{file}.pdf"'
-    return response
\ No newline at end of file
+
+
+def stream_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("Ингредиент", "Ед. измерения", "Количество"))
+    for item in ingredients.iterator():
+        yield writer.writerow(
+            (
+                item["ingredient__name"],
+                item["ingredient__measurement_unit"],
+                item["amount"],
+            )
+        )
+
+
+FORMATS = {
+    "txt": (stream_txt, "text/plain; charset=utf-8"),
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+}
+
+
+def shopping_list_response(user, file_format="txt"):
+    if file_format not in FORMATS:
+        file_format = "txt"
+    stream, content_type = FORMATS[file_format]
+    response = StreamingHttpResponse(
+        stream(get_shopping_list(user)), content_type=content_type
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{FILENAME}.{file_format}"'
+    )
+    return response
+
+
+@api_view(["GET"])
+def download_shopping_cart(request):
+    return shopping_list_response(
+        request.user, request.query_params.get(FILE_FORMAT_PARAM, "txt")
+    )
@@ -1,34 +1,90 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework
 from rest_framework import filters
 
 from recipes import models
+from recipes.cache import tag_ids_by_slug
+from recipes.search import search_recipes
+
+TRUE_VALUES = ("1", "true", "True")
 
 
 class RecipeFilter(rest_framework.FilterSet):
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name="tags__slug",
-        queryset=models.Tag.objects.all(),
-        to_field_name="slug",
-    )
+    tags = rest_framework.CharFilter(method="filter_tags")
     is_favorited = rest_framework.CharFilter(method="filter_favorited")
     is_in_shopping_cart = rest_framework.CharFilter(
         method="filter_shopping_cart"
     )
+    search = rest_framework.CharFilter(method="filter_search")
 
     class Meta:
         model = models.Recipe
         fields = ["tags", "author"]
 
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов ?tags=a&tags=b."""
+        tag_ids = tag_ids_by_slug()
+        selected = [
+            tag_ids[slug]
+            for slug in self.data.getlist(name)
+            if slug in tag_ids
+        ]
+        return queryset.filter(
+            pk__in=models.Recipe.tags.through.objects.filter(
+                tag_id__in=selected
+            ).values("recipe_id")
+        )
+
     def filter_favorited(self, queryset, name, value):
-        if value == "True":
-            return queryset.filter(favorite_recipes__user=self.request.user)
-        return queryset
+        return self.filter_marked(queryset, name, value, models.Favorite)
 
     def filter_shopping_cart(self, queryset, name, value):
-        if value == "True":
-            return queryset.filter(shopping_cart__user=self.request.user)
-        return queryset
+        return self.filter_marked(queryset, name, value, models.Cart)
+
+    def filter_marked(self, queryset, name, value, model):
+        """Рецепты, отмеченные пользователем в model, через EXISTS."""
+        if value not in TRUE_VALUES:
+            return queryset
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none()
+        if name not in queryset.query.annotations:
+            queryset = queryset.annotate(
+                **{
+                    name: Exists(
+                        model.objects.filter(user=user, recipe=OuterRef("pk"))
+                    )
+                }
+            )
+        return queryset.filter(**{name: True})
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """Сортировка ленты с id последним ключом для стабильного порядка.
+
+    Подбор по ингредиентам по умолчанию сортируется по доле имеющихся,
+    поиск — по релевантности.
+    """
 
+    def get_default_ordering(self, view):
+        if getattr(view, "action", None) == "cookable":
+            return ["-coverage"]
+        return super().get_default_ordering(view)
 
-class CustomSearchFilter(filters.SearchFilter):
-    search_param = "name"
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # по релевантности, только если поиск реально применён: пустой
+        # ?search= фильтр пропускает, и search_rank в выборке нет
+        if (
+            not request.query_params.get(self.ordering_param)
+            and getattr(view, "action", None) != "cookable"
+            and "search_rank" in queryset.query.annotations
+        ):
+            ordering = ["-search_rank"]
+        if ordering is None:
+            return ordering
+        tiebreaker = "-id" if ordering[-1].startswith("-") else "id"
+        return [*ordering, tiebreaker]
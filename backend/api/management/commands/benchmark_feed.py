@@ -0,0 +1,62 @@
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.representation import RecipeRepresentation
+from api.serializers import RecipeSerializer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение RecipeSerializer и RecipeRepresentation на странице "
+        "ленты: совпадение JSON и время вывода"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-size", type=int, default=50, help="Рецептов на странице"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Повторов каждого замера"
+        )
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get("/api/recipes/"))
+        request.user = AnonymousUser()
+        recipes = list(
+            Recipe.objects.for_feed(request.user)[:options["page_size"]]
+        )
+        if not recipes:
+            raise CommandError("В базе нет рецептов")
+        context = {"request": request}
+
+        def serializer():
+            return RecipeSerializer(recipes, many=True, context=context).data
+
+        def representation():
+            return RecipeRepresentation(
+                recipes, many=True, context=context
+            ).data
+
+        renderer = JSONRenderer()
+        if renderer.render(serializer()) != renderer.render(representation()):
+            raise CommandError("JSON RecipeRepresentation отличается")
+
+        repeat = options["repeat"]
+        slow = min(timeit.repeat(serializer, number=1, repeat=repeat))
+        fast = min(timeit.repeat(representation, number=1, repeat=repeat))
+        self.stdout.write(
+            f"Рецептов: {len(recipes)}\n"
+            f"RecipeSerializer: {slow * 1000:.2f} мс\n"
+            f"RecipeRepresentation: {fast * 1000:.2f} мс\n"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"JSON совпадает, быстрее в {slow / fast:.1f} раз"
+            )
+        )
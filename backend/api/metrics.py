@@ -0,0 +1,26 @@
+import os
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .authentication import token_cache_stats
+from .profiling import endpoint_stats
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Счётчики процесса, который обслужил запрос; DELETE сбрасывает
+    сводку по эндпоинтам."""
+    if request.method == "DELETE":
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(
+        {
+            "pid": os.getpid(),
+            "token_cache": token_cache_stats.as_dict(),
+            "endpoints": endpoint_stats.as_dict(),
+        }
+    )
@@ -1,13 +1,213 @@
-from rest_framework import mixins, viewsets
+import hashlib
 
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import mixins, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-class CreateDeleteViewSet(
-    mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet
-):
-    pass
+from .serializers import CustomRecipeSerializer, RecipeIdsSerializer
+from recipes.cache import get_version
+from recipes.models import Recipe
+from users.models import Subscriber
 
 
 class GetViewSet(
     mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
 ):
     pass
+
+
+class UserRecipeViewSet(viewsets.GenericViewSet):
+    """Добавление рецепта в список пользователя и удаление из него.
+
+    Повтор отсекает уникальное ограничение (user, recipe), удаление —
+    один DELETE; счётчик рецепта сдвигается в той же транзакции.
+    """
+
+    permission_classes = [IsAuthenticated]
+    model = None
+    counter_field = None
+    already_added_message = None
+    not_added_message = None
+
+    def create(self, request, recipe_id):
+        recipe = get_object_or_404(Recipe, pk=recipe_id)
+        with transaction.atomic():
+            instance = self.model.objects.add(request.user, recipe)
+            if instance is None:
+                raise ValidationError(self.already_added_message)
+            Recipe.objects.filter(pk=recipe.pk).shift_counter(
+                self.counter_field, 1
+            )
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, recipe_id):
+        with transaction.atomic():
+            removed = self.model.objects.remove(request.user, recipe_id)
+            if removed:
+                Recipe.objects.filter(pk=recipe_id).shift_counter(
+                    self.counter_field, -removed
+                )
+        if not removed:
+            get_object_or_404(Recipe, pk=recipe_id)
+            raise ValidationError(self.not_added_message)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def current(self, request):
+        """Рецепты, которые сейчас в списке пользователя."""
+        recipes = Recipe.objects.filter(
+            pk__in=self.model.objects.filter(user=request.user).values(
+                "recipe"
+            )
+        )
+        serializer = CustomRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    def bulk_add(self, request):
+        """Добавляет рецепты из {"recipes": [id, ...]} одним запросом."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data["recipes"]
+        with transaction.atomic():
+            self.model.objects.add_many(request.user, recipe_ids)
+            Recipe.objects.filter(pk__in=recipe_ids).reconcile_counters()
+        return self.current(request)
+
+    def bulk_remove(self, request):
+        """Убирает рецепты из {"recipes": [id, ...]}, без списка — все."""
+        recipe_ids = None
+        if "recipes" in request.data:
+            serializer = RecipeIdsSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            recipe_ids = serializer.validated_data["recipes"]
+        with transaction.atomic():
+            removed = self.model.objects.remove_many(request.user, recipe_ids)
+            Recipe.objects.filter(pk__in=removed).reconcile_counters()
+        return self.current(request)
+
+
+class CachedReferenceMixin:
+    """Кэш ответов для справочников с поддержкой условных GET.
+
+    Ключ кэша содержит версию модели, которую сигналы меняют при каждом
+    сохранении или удалении, поэтому старые ответы просто перестают
+    читаться. Версия заодно служит ETag и Last-Modified.
+    """
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        model = self.get_queryset().model
+        version = get_version(model)
+        etag = f'W/"{model._meta.label_lower}-{version}"'
+        last_modified = version // 1000
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = f"response:{version}:{request.get_full_path()}"
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data, settings.REFERENCE_CACHE_TIMEOUT)
+            else:
+                response = Response(data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+
+class CachedFeedMixin:
+    """Кэш страниц ленты, общий для всех пользователей.
+
+    Страница собирается как для анонима и кладётся в кэш под версией
+    рецептов, которую сигналы меняют после каждого коммита, затрагивающего
+    рецепты, их ингредиенты, теги или авторов. Флаги конкретного
+    пользователя накладываются поверх одним запросом. Фильтры по
+    избранному и корзине и сортировка по популярности идут мимо кэша.
+    """
+
+    uncached_params = ("is_favorited", "is_in_shopping_cart")
+    uncached_ordering = "favorites_count"
+
+    def use_feed_cache(self, request):
+        params = request.query_params
+        if any(params.get(name) for name in self.uncached_params):
+            return False
+        return self.uncached_ordering not in params.get("ordering", "")
+
+    def get_feed_user(self):
+        if getattr(self, "shared_page", False):
+            return AnonymousUser()
+        return self.request.user
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_feed_cache(request):
+            return super().list(request, *args, **kwargs)
+        url = request.build_absolute_uri()
+        key = "feed:{}:{}".format(
+            get_version(Recipe), hashlib.md5(url.encode()).hexdigest()
+        )
+        data = cache.get(key)
+        if data is None:
+            self.shared_page = True
+            try:
+                response = super().list(request, *args, **kwargs)
+            finally:
+                self.shared_page = False
+            if response.status_code != 200:
+                return response
+            data = response.data
+            cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+        self.apply_user_flags(data, request.user)
+        return Response(data)
+
+    def apply_user_flags(self, data, user):
+        if user.is_anonymous:
+            return
+        recipes = data["results"] if isinstance(data, dict) else data
+        flags = {
+            pk: rest
+            for pk, *rest in Recipe.objects.filter(
+                pk__in=[recipe["id"] for recipe in recipes]
+            )
+            .with_user_flags(user)
+            .annotate(
+                author_subscribed=Exists(
+                    Subscriber.objects.filter(
+                        subscriber=user, author=OuterRef("author")
+                    )
+                )
+            )
+            .values_list(
+                "pk", "is_favorited", "is_in_shopping_cart",
+                "author_subscribed",
+            )
+        }
+        for recipe in recipes:
+            favorited, in_cart, subscribed = flags.get(
+                recipe["id"], (False, False, False)
+            )
+            recipe["is_favorited"] = favorited
+            recipe["is_in_shopping_cart"] = in_cart
+            recipe["author"]["is_subscribed"] = subscribed
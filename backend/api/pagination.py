@@ -1,5 +1,15 @@
-from rest_framework import pagination
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework import filters, pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class OnlyDataPagination(pagination.PageNumberPagination):
@@ -8,4 +18,153 @@ class OnlyDataPagination(pagination.PageNumberPagination):
 
 
 class LimitPagination(pagination.PageNumberPagination):
-    page_size_query_param = "6"
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+def encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} нельзя положить в курсор")
+
+
+def estimate_count(queryset):
+    """Оценка числа строк планировщиком PostgreSQL, иначе точный COUNT."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class KeysetPagination(pagination.BasePagination):
+    """Пагинация по ключу сортировки вместо OFFSET.
+
+    Курсор хранит значения полей сортировки последнего элемента страницы,
+    следующая страница выбирается условием «строго после» этого кортежа,
+    поэтому глубина прокрутки не влияет на стоимость запроса. Сортировка
+    берётся из OrderingFilter вьюсета или из его атрибута ordering и
+    всегда заканчивается по id. Число записей не считается, пока его не
+    попросят параметром with_count (на PostgreSQL — оценка планировщика).
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    count_query_param = "with_count"
+    max_page_size = 100
+    ordering = ("-create_date", "-id")
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.count = None
+        queryset = queryset.order_by(*self.ordering)
+        if request.query_params.get(self.count_query_param):
+            self.count = estimate_count(queryset)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound("Некорректный курсор")
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, filters.OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        else:
+            ordering = getattr(view, "ordering", None)
+        ordering = list(ordering or self.ordering)
+        if ordering[-1].lstrip("-") != "id":
+            ordering.append("-id" if ordering[-1].startswith("-") else "id")
+        return ordering
+
+    def after(self, position):
+        """Условие «кортеж полей сортировки строго после position»."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                previous.lstrip("-"): position[previous.lstrip("-")]
+                for previous in self.ordering[:index]
+            }
+            condition |= Q(**equal, **{f"{name}__{lookup}": position[name]})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except ValueError:
+            raise NotFound("Некорректный курсор")
+        names = [field.lstrip("-") for field in self.ordering]
+        if not isinstance(position, dict) or set(position) != set(names):
+            raise NotFound("Некорректный курсор")
+        return position
+
+    def encode_cursor(self, instance):
+        position = {
+            field.lstrip("-"): getattr(instance, field.lstrip("-"))
+            for field in self.ordering
+        }
+        data = json.dumps(position, default=encode_value)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response["count"] = self.count
+        response["next"] = self.get_next_link()
+        response["results"] = data
+        return Response(response)
+
+
+class FeedPagination(LimitPagination):
+    """Номера страниц по умолчанию, курсор — с ?pagination=cursor."""
+
+    mode_query_param = "pagination"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get(self.mode_query_param) == "cursor":
+            self.keyset = KeysetPagination(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,196 @@
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+class QueryRecorder:
+    """execute_wrapper, считающий запросы, их время и повторы."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """SQL, выполненные по нескольку раз за запрос, — признак N+1."""
+        return {
+            sql: count
+            for sql, count in self.statements.items()
+            if count >= settings.PROFILING_DUPLICATE_THRESHOLD
+        }
+
+
+class EndpointStats:
+    """Сводка по эндпоинтам в текущем процессе."""
+
+    signatures_limit = 5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, timings, recorder):
+        duplicates = recorder.duplicates()
+        with self.lock:
+            stats = self.endpoints.setdefault(
+                endpoint,
+                {
+                    "requests": 0,
+                    "total_ms": 0.0,
+                    "db_ms": 0.0,
+                    "view_ms": 0.0,
+                    "render_ms": 0.0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "requests_with_duplicates": 0,
+                    "duplicates": Counter(),
+                },
+            )
+            stats["requests"] += 1
+            for name, value in timings.items():
+                stats[f"{name}_ms"] += value
+            stats["queries"] += recorder.count
+            stats["max_queries"] = max(stats["max_queries"], recorder.count)
+            if duplicates:
+                stats["requests_with_duplicates"] += 1
+                stats["duplicates"].update(duplicates)
+
+    def as_dict(self):
+        with self.lock:
+            endpoints = {
+                endpoint: dict(stats, duplicates=stats["duplicates"].copy())
+                for endpoint, stats in self.endpoints.items()
+            }
+        report = {}
+        for endpoint, stats in sorted(
+            endpoints.items(), key=lambda item: -item[1]["total_ms"]
+        ):
+            requests = stats["requests"]
+            report[endpoint] = {
+                "requests": requests,
+                "avg_total_ms": round(stats["total_ms"] / requests, 2),
+                "avg_db_ms": round(stats["db_ms"] / requests, 2),
+                "avg_view_ms": round(stats["view_ms"] / requests, 2),
+                "avg_render_ms": round(stats["render_ms"] / requests, 2),
+                "avg_queries": round(stats["queries"] / requests, 2),
+                "max_queries": stats["max_queries"],
+                "requests_with_duplicates": stats["requests_with_duplicates"],
+                "top_duplicates": [
+                    {"sql": sql, "count": count}
+                    for sql, count in stats["duplicates"].most_common(
+                        self.signatures_limit
+                    )
+                ],
+            }
+        return report
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+def endpoint_name(request):
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match else "<unresolved>"
+    return f"{request.method} /{route.lstrip('^').rstrip('$')}"
+
+
+class ProfilingMiddleware:
+    """Число запросов к БД и время ответа по эндпоинтам.
+
+    Профилирует долю PROFILING_SAMPLE_RATE запросов: время в БД, во вьюхе
+    (вместе с сериализацией) и на рендер ответа, а также повторяющиеся
+    SQL. Сводка доступна в /api/metrics/, а при PROFILING_SERVER_TIMING
+    цифры запроса уходят в заголовок Server-Timing. Потоковые ответы
+    попадают в сводку после отдачи, без заголовка.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request.profiling_marks = {"start": time.perf_counter()}
+        with self.record_queries(recorder):
+            response = self.get_response(request)
+
+        if response.streaming:
+            # запросы потокового ответа идут уже после выхода из вьюхи
+            response.streaming_content = self.profile_stream(
+                response.streaming_content, request, recorder
+            )
+            return response
+        timings = self.finish(request, recorder)
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = self.server_timing(timings, recorder)
+        return response
+
+    def record_queries(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def profile_stream(self, content, request, recorder):
+        try:
+            with self.record_queries(recorder):
+                yield from content
+        finally:
+            self.finish(request, recorder)
+
+    def finish(self, request, recorder):
+        marks = request.profiling_marks
+        end = time.perf_counter()
+        view_end = marks.get("view_end", end)
+        render_end = marks.get("render_end", view_end)
+        db = recorder.duration * 1000
+        timings = {
+            "db": db,
+            "view": max((view_end - marks["start"]) * 1000 - db, 0.0),
+            "render": (render_end - view_end) * 1000,
+            "total": (end - marks["start"]) * 1000,
+        }
+        endpoint_stats.record(endpoint_name(request), timings, recorder)
+        return timings
+
+    def process_template_response(self, request, response):
+        marks = getattr(request, "profiling_marks", None)
+        if marks is not None:
+            marks["view_end"] = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: marks.update(render_end=time.perf_counter())
+            )
+        return response
+
+    def server_timing(self, timings, recorder):
+        duplicates = sum(recorder.duplicates().values())
+        descriptions = {
+            "db": f"{recorder.count} queries, {duplicates} duplicated",
+            "view": "view and serialization without db",
+        }
+        return ", ".join(
+            f'{name};dur={value:.2f};desc="{descriptions[name]}"'
+            if name in descriptions
+            else f"{name};dur={value:.2f}"
+            for name, value in timings.items()
+        )
@@ -0,0 +1,38 @@
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+encoder = JSONEncoder()
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer на orjson, без него — обычный из DRF.
+
+    Типы, которых orjson не знает (Decimal, ленивые строки переводов,
+    timedelta и т.п.), отдаются кодировщику DRF, так что вывод совпадает
+    с JSONRenderer. Ответы с отступами (браузерный API, ?indent)
+    по-прежнему собирает стандартный json.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        ret = orjson.dumps(
+            data,
+            default=encoder.default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+        # как и DRF, экранируем разделители строк, недопустимые в JS
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
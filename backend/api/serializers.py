@@ -1,16 +1,35 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
+from drf_extra_fields.fields import HybridImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
 from rest_framework.relations import SlugRelatedField
 
 from recipes import models
+from recipes.images import schedule_variants, variant_urls
+from recipes.search import update_search_index
 from users.models import Subscriber
+from users.serializers import UserSerializer
 
 User = get_user_model()
 
 
+class ImageVariantsField(serializers.Field):
+    """Ссылки на уменьшенные копии картинки рецепта.
+
+    Пока фоновая обработка не закончилась, все ссылки ведут на оригинал.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return variant_urls(recipe, self.context.get("request"))
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         fields = (
@@ -24,6 +43,7 @@ class TagSerializer(serializers.ModelSerializer):
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         fields = (
+            'id',
             'name',
             'measurement_unit',
         )
@@ -49,24 +69,6 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         model = models.RecipeIngredients
 
 
-class UserSerializer(serializers.ModelSerializer):
-    is_subscribed = serializers.SerializerMethodField()
-
-    class Meta:
-        model = User
-        fields = (
-            "email",
-            "id",
-            "username",
-            "first_name",
-            "last_name",
-            "is_subscribed",
-        )
-
-    def get_is_subscribed(self, obj):
-        return False
-
-
 class RecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientsSerializer(
@@ -74,45 +76,116 @@ class RecipeSerializer(serializers.ModelSerializer):
         source="ingredientsamount"
     )
     tags = TagSerializer(many=True)
-    image = Base64ImageField()
-    is_favorited = serializers.SerializerMethodField(source="favorite_recipes")
-    is_in_shopping_cart = serializers.SerializerMethodField(
-        source="shopping_cart"
-    )
+    image = HybridImageField()
+    image_variants = ImageVariantsField()
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
-        exclude = ('favorite', )
+        exclude = (
+            'favorite',
+            'favorites_count',
+            'carts_count',
+            'image_variants_ready',
+            'search_vector',
+        )
         model = models.Recipe
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_amount_data = validated_data.pop("ingredientsamount")
         instance = super().create(validated_data)
         self.ingredients_set(ingredients_amount_data, instance)
+        update_search_index([instance.pk])
+        schedule_variants(instance)
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients_amount_data = validated_data.pop("ingredientsamount")
+        ingredients_amount_data = validated_data.pop("ingredientsamount", None)
+        if "image" in validated_data:
+            instance.image_variants_ready = False
         instance = super().update(instance, validated_data)
-        models.RecipeIngredients.objects.filter(recipe=instance).delete()
-        self.ingredients_set(ingredients_amount_data, instance)
+        if "image" in validated_data:
+            schedule_variants(instance)
+        if ingredients_amount_data is not None:
+            self.ingredients_update(ingredients_amount_data, instance)
+        update_search_index([instance.pk])
 
         return instance
 
-    def ingredients_set(self, ingredients_amount_data, recipe_instance):
-        ingredients = []
+    def validate_ingredients(self, ingredients_amount_data):
+        if not ingredients_amount_data:
+            raise ValidationError("Нужен хотя бы один ингредиент")
+        ids = []
         for ingredient_amount in ingredients_amount_data:
-            ingredient_id = ingredient_amount["ingredient"]["id"]
-            ingredient = get_object_or_404(models.Ingredient, pk=ingredient_id)
-            amount = ingredient_amount["amount"]
-
-            recipe_ingredients_instance = models.RecipeIngredients(
-                ingredient=ingredient, recipe=recipe_instance, amount=amount
+            ingredient_id = ingredient_amount.get("ingredient", {}).get("id")
+            if ingredient_id is None:
+                raise ValidationError("У ингредиента не указан id")
+            ids.append(ingredient_id)
+
+        repeated = sorted({pk for pk in ids if ids.count(pk) > 1})
+        if repeated:
+            raise ValidationError(
+                f"Ингредиенты повторяются: {', '.join(map(str, repeated))}"
+            )
+        found = models.Ingredient.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise ValidationError(
+                f"Нет ингредиентов с id: {', '.join(map(str, missing))}"
             )
-            ingredients.append(recipe_ingredients_instance)
+        for ingredient_amount in ingredients_amount_data:
+            ingredient_amount["ingredient"] = found[
+                ingredient_amount["ingredient"]["id"]
+            ]
+        return ingredients_amount_data
 
-        models.RecipeIngredients.objects.bulk_create(ingredients)
+    def ingredients_set(self, ingredients_amount_data, recipe_instance):
+        models.RecipeIngredients.objects.bulk_create(
+            models.RecipeIngredients(
+                ingredient=ingredient_amount["ingredient"],
+                recipe=recipe_instance,
+                amount=ingredient_amount["amount"],
+            )
+            for ingredient_amount in ingredients_amount_data
+        )
 
-    def get_favorited(self, recipe):
+    def ingredients_update(self, ingredients_amount_data, recipe_instance):
+        """Меняет только отличающиеся строки ингредиентов рецепта."""
+        incoming = {
+            ingredient_amount["ingredient"].pk: ingredient_amount
+            for ingredient_amount in ingredients_amount_data
+        }
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe_instance.ingredientsamount.all()
+        }
+        removed = existing.keys() - incoming.keys()
+        if removed:
+            models.RecipeIngredients.objects.filter(
+                recipe=recipe_instance, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, recipe_ingredient in existing.items():
+            if ingredient_id not in incoming:
+                continue
+            amount = incoming[ingredient_id]["amount"]
+            if recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if changed:
+            models.RecipeIngredients.objects.bulk_update(changed, ["amount"])
+        added = [
+            incoming[ingredient_id]
+            for ingredient_id in incoming.keys() - existing.keys()
+        ]
+        if added:
+            self.ingredients_set(added, recipe_instance)
+
+    def get_is_favorited(self, recipe):
+        if hasattr(recipe, "is_favorited"):
+            return recipe.is_favorited
         user = self.context.get("request").user
 
         if user.is_anonymous:
@@ -120,13 +193,15 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         return recipe.favorite_recipes.filter(user=user).exists()
 
-    def get_in_cart(self, recipe):
+    def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, "is_in_shopping_cart"):
+            return recipe.is_in_shopping_cart
         user = self.context.get("request").user
 
         if user.is_anonymous:
             return False
 
-        return recipe.shopping_cart.filter(user=user).exists()
+        return recipe.cart.filter(user=user).exists()
 
     def to_internal_value(self, data):
         self.fields["tags"] = serializers.PrimaryKeyRelatedField(
@@ -135,12 +210,62 @@ class RecipeSerializer(serializers.ModelSerializer):
         return super(RecipeSerializer, self).to_internal_value(data)
 
 
+class CookableRecipeSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    missing = serializers.IntegerField(min_value=0, default=0)
+
+    def to_internal_value(self, data):
+        ingredients = [
+            value
+            for values in data.getlist("ingredients")
+            for value in values.split(",")
+            if value
+        ]
+        return super().to_internal_value(
+            {**data.dict(), "ingredients": ingredients}
+        )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массовых операций с избранным и корзиной."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_MAX,
+    )
+
+    def validate_recipes(self, recipe_ids):
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        found = set(
+            models.Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                "pk", flat=True
+            )
+        )
+        missing = [pk for pk in recipe_ids if pk not in found]
+        if missing:
+            raise ValidationError(f"Нет рецептов с id {missing}")
+        return recipe_ids
+
+
 class CustomRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         fields = (
             "id",
             "name",
             "image",
+            "image_variants",
             "cooking_time",
         )
         model = models.Recipe
@@ -160,18 +285,6 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = "__all__"
         model = models.Favorite
 
-    def validate(self, attrs):
-        request = self.context.get("request")
-        recipe_id = self.context.get("view").kwargs.get("recipe_id")
-        user = request.user
-
-        is_favorite = user.favorite_recipes.filter(
-            recipe_id=recipe_id).exists()
-
-        if is_favorite and request.method == "POST":
-            raise ValidationError("Добавлен ранее")
-        return attrs
-
     def to_representation(self, instance):
         request = self.context.get("request")
         context = {"request": request}
@@ -186,17 +299,6 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         fields = ('recipe', 'user', )
         model = models.Cart
 
-    def validate(self, attrs):
-        request = self.context.get("request")
-        recipe_id = self.context.get("view").kwargs.get("recipe_id")
-        user = request.user
-
-        in_cart = user.shopping_cart.filter(recipe_id=recipe_id).exists()
-
-        if in_cart and request.method == "POST":
-            raise ValidationError("Рецепт уже в корзине.")
-        return attrs
-
     def to_representation(self, instance):
         request = self.context.get("request")
         context = {"request": request}
@@ -221,15 +323,14 @@ class UserSubscribeSerializer(serializers.ModelSerializer):
         fields = "__all__"
         model = Subscriber
 
-    def create(self, validated_data):
-        subscriber = validated_data["subscriber"]
-        author = validated_data["author"]
 
-        if subscriber == author:
-            raise serializers.ValidationError("Подписка на себя")
+class SubscriptionSerializer(UserSerializer):
+    recipes = PreviewRecipeSerializer(
+        many=True,
+        read_only=True,
+        source="latest_recipes"
+    )
+    recipes_count = serializers.IntegerField(read_only=True)
 
-        if subscriber.authors.filter(author=author).exists():
-            raise serializers.ValidationError(
-                {"detail": "Уже подписан"}
-            )
-        return super().create(validated_data)
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ["recipes", "recipes_count"]
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    forget_tokens(instance.key)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_token(request, **kwargs):
+    token = getattr(request, "auth", None)
+    if isinstance(token, Token):
+        forget_tokens(token.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    forget_tokens(
+        *Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
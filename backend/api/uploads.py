@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Слишком большой запрос"
+    default_code = "request_too_large"
+
+
+def check_content_length(request):
+    """Отклоняет запрос по заголовку Content-Length, не читая тело."""
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > settings.RECIPE_UPLOAD_MAX_SIZE:
+        raise RequestTooLarge(
+            f"Размер запроса больше {settings.RECIPE_UPLOAD_MAX_SIZE} байт"
+        )
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Обрывает загрузку файла, как только он превысил допустимый размер.
+
+    Нужен для запросов без Content-Length; данные дальше по цепочке
+    передаёт TemporaryFileUploadHandler, который пишет их на диск.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_UPLOAD_MAX_SIZE:
+            raise RequestTooLarge(
+                f"Файл больше {settings.RECIPE_UPLOAD_MAX_SIZE} байт"
+            )
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def streaming_upload_handlers(request):
+    return [LimitedUploadHandler(request), TemporaryFileUploadHandler(request)]
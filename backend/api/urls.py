@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from . import download, views
+from . import download, metrics, views
+from users.views import UserViewSet
 
 router_v1 = routers.DefaultRouter()
 router_v1.register(
@@ -9,21 +10,6 @@ router_v1.register(
     views.RecipeViewSet,
     basename="recipes",
 )
-router_v1.register(
-    r"recipes/(?P<recipe_id>\d+)/favorite",
-    views.FavoriteViewSet,
-    basename="favorite",
-)
-router_v1.register(
-    r"recipes/(?P<recipe_id>\d+)/shopping_cart",
-    views.ShoppingCartViewSet,
-    basename="shopping_cart",
-)
-router_v1.register(
-    r"users/(?P<user_id>\d+)/subscribe",
-    views.UserSubscriberViewSet,
-    basename="subscribe",
-)
 router_v1.register(
     r"users/subscriptions",
     views.UserSubscriberViewSet,
@@ -31,6 +17,7 @@ router_v1.register(
 )
 router_v1.register("tags", views.TagViewSet)
 router_v1.register("ingredients", views.IngredientViewSet)
+router_v1.register("users", UserViewSet)
 
 
 urlpatterns = [
@@ -40,11 +27,39 @@ urlpatterns = [
         name='download_shopping_cart'
     ),
     path(
-        'recipes/<int:id>/shopping_cart/',
-        views.ShoppingCartViewSet,
-        name='shopping_cart'
+        "recipes/favorite/",
+        views.FavoriteViewSet.as_view(
+            {"get": "current", "post": "bulk_add", "delete": "bulk_remove"}
+        ),
+        name="favorite_bulk",
+    ),
+    path(
+        "recipes/shopping_cart/",
+        views.ShoppingCartViewSet.as_view(
+            {"get": "current", "post": "bulk_add", "delete": "bulk_remove"}
+        ),
+        name="shopping_cart_bulk",
+    ),
+    path(
+        "recipes/<int:recipe_id>/favorite/",
+        views.FavoriteViewSet.as_view({"post": "create", "delete": "destroy"}),
+        name="favorite",
+    ),
+    path(
+        "recipes/<int:recipe_id>/shopping_cart/",
+        views.ShoppingCartViewSet.as_view(
+            {"get": "list", "post": "create", "delete": "destroy"}
+        ),
+        name="shopping_cart",
+    ),
+    path(
+        "users/<int:user_id>/subscribe/",
+        views.UserSubscriberViewSet.as_view(
+            {"post": "create", "delete": "destroy"}
+        ),
+        name="subscribe",
     ),
+    path("metrics/", metrics.metrics, name="metrics"),
     path("", include(router_v1.urls)),
-    path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
 ]
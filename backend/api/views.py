@@ -1,32 +1,95 @@
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db.models import Count, Prefetch
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.mixins import ListModelMixin
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from . import mixins, serializers
-from .filters import CustomSearchFilter, RecipeFilter
-from .pagination import OnlyDataPagination
+from . import download, mixins, serializers, uploads
+from .filters import RecipeFilter, RecipeOrderingFilter
+from .pagination import FeedPagination, OnlyDataPagination
+from .parsers import FastJSONParser
 from .permissions import IsAuthorOrStaffOrReadOnly
+from .representation import RecipeRepresentation
 from recipes import models
+from recipes.autocomplete import search_ingredients
 from users.models import Subscriber
 
 User = get_user_model()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(mixins.CachedFeedMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthorOrStaffOrReadOnly]
-    queryset = models.Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, RecipeOrderingFilter]
     filterset_class = RecipeFilter
     filterset_fields = ["tags", "author__id"]
+    ordering_fields = ["create_date", "favorites_count", "cooking_time"]
+    ordering = ["-create_date"]
+    pagination_class = FeedPagination
+    parser_classes = [FastJSONParser, MultiPartParser]
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = uploads.streaming_upload_handlers(request)
+        return super().initialize_request(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        uploads.check_content_length(request)
+
+    def get_queryset(self):
+        return models.Recipe.objects.for_feed(self.get_feed_user())
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        # формы browsable API строятся клоном запроса с методом POST/PUT
+        reading = self.action in ("list", "retrieve")
+        if reading and self.request.method == "GET":
+            kwargs.setdefault("context", self.get_serializer_context())
+            return RecipeRepresentation(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serializer_class(self):
+        if self.action == "cookable":
+            return serializers.CookableRecipeSerializer
+        return super().get_serializer_class()
+
+    @action(methods=["get"], detail=False)
+    def cookable(self, request):
+        """Что можно приготовить из ?ingredients=1,2,3.
+
+        ?missing=K допускает до K недостающих ингредиентов, по умолчанию
+        нужны все. Сортировка — по доле имеющихся ингредиентов.
+        """
+        params = serializers.CookableQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(
+            self.get_queryset().cookable(
+                params.validated_data["ingredients"],
+                params.validated_data["missing"],
+            )
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(methods=["delete"], detail=True)
     def delete(self, request, *args, **kwargs):
@@ -36,7 +99,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(mixins.CachedReferenceMixin, viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     queryset = models.Tag.objects.all()
     serializer_class = serializers.TagSerializer
@@ -46,123 +109,83 @@ class TagViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(mixins.CachedReferenceMixin, viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     queryset = models.Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
     pagination_class = OnlyDataPagination
-    filter_backends = [CustomSearchFilter, ]
-    search_fields = ["^name"]
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if not name:
+            return super().list(request, *args, **kwargs)
+        # подсказки отвечает индекс в памяти, кэш ответов им не нужен
+        serializer = self.get_serializer(search_ingredients(name), many=True)
+        return Response(serializer.data)
 
-class FavoriteViewSet(mixins.CreateDeleteViewSet):
-    serializer_class = serializers.FavoriteSerializer
 
-    def perform_create(self, serializer):
-        recipe = get_object_or_404(
-            models.Recipe,
-            pk=self.kwargs.get("recipe_id")
-        )
-        title_data = {
-            "recipe": recipe,
-            "user": self.request.user
-        }
-        serializer.save(**title_data)
-
-    @action(methods=["delete"], detail=True)
-    def delete(self, request, recipe_id):
-        user = self.request.user
-        recipe = get_object_or_404(models.Recipe, pk=recipe_id)
-        favorite = get_object_or_404(
-            models.FavoriteRecipe,
-            user=user,
-            recipe=recipe
-        )
-        favorite.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+class FavoriteViewSet(mixins.UserRecipeViewSet):
+    serializer_class = serializers.FavoriteSerializer
+    model = models.Favorite
+    counter_field = "favorites_count"
+    already_added_message = "Добавлен ранее"
+    not_added_message = "Рецепта нет в избранном"
 
 
-class ShoppingCartViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsAuthenticated]
+class ShoppingCartViewSet(mixins.UserRecipeViewSet):
     serializer_class = serializers.ShoppingCartSerializer
-
-    def perform_create(self, serializer):
-        recipe = get_object_or_404(
-            models.Recipe,
-            pk=self.kwargs.get("recipe_id")
-        )
-        title_data = {
-            "recipe": recipe,
-            "user": self.request.user
-        }
-        serializer.save(**title_data)
+    model = models.Cart
+    counter_field = "carts_count"
+    already_added_message = "Рецепт уже в корзине."
+    not_added_message = "Рецепта нет в корзине."
 
     def list(self, request, *args, **kwargs):
-        user = self.request.user
-        queryset = models.Cart.objects.filter(user=user)
-        total_ingredients = {}
-        for shopping_cart in queryset:
-            recipe = shopping_cart.recipe
-            recipe_ingredients = serializers.RecipeIngredientsSerializer(
-                recipe.ingredientsamount,
-                many=True
-            ).data
-
-            for ingredient in recipe_ingredients:
-                name, amount = ingredient["name"], ingredient["amount"]
-                measurement_unit = ingredient["measurement_unit"]
-                if total_ingredients.get(name):
-                    total_ingredients[name] = {
-                        measurement_unit: total_ingredients[name][
-                            measurement_unit
-                        ]
-                        + amount
-                    }
-                else:
-                    total_ingredients[name] = {measurement_unit: amount}
-
-        filename = "basket.txt"
-        content = ""
-        for ingredient in total_ingredients:
-            measurement_unit, amount = total_ingredients[ingredient].popitem()
-            content += f"{ingredient} ({measurement_unit}) — {amount}\n"
-        response = HttpResponse(content, content_type="text/plain")
-        response["Content-Disposition"] = "attachment; filename={0}".format(
-            filename
+        return download.shopping_list_response(
+            request.user,
+            request.query_params.get(download.FILE_FORMAT_PARAM, "txt"),
         )
-        return response
-
-    @action(methods=["delete"], detail=True)
-    def delete(self, request, recipe_id):
-        user = self.request.user
-        recipe = get_object_or_404(models.Recipe, pk=recipe_id)
-        cart = get_object_or_404(models.ShoppingCart, user=user, recipe=recipe)
-        cart.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UserSubscriberViewSet(viewsets.ModelViewSet):
+class UserSubscriberViewSet(ListModelMixin, viewsets.GenericViewSet):
     serializer_class = serializers.UserSubscribeSerializer
     permission_classes = [IsAuthenticated, ]
+    pagination_class = FeedPagination
+    ordering = ["id"]
 
-    def get_queryset(self):
-        subscriber = self.request.user.subscribers.all()
-        return subscriber
+    def get_serializer_class(self):
+        if self.action == "list":
+            return serializers.SubscriptionSerializer
+        return super().get_serializer_class()
 
-    def perform_create(self, serializer):
-        author = get_object_or_404(User, pk=self.kwargs.get("user_id"))
-        title_data = {"subscriber": self.request.user, "author": author}
-        if serializer.is_valid():
-            serializer.save(**title_data)
-
-    @action(methods=["delete"], detail=True)
-    def delete(self, request, user_id):
+    def get_queryset(self):
         user = self.request.user
-        author = get_object_or_404(User, pk=user_id)
-        subscribe = get_object_or_404(
-            Subscriber,
-            subscriber=user,
-            author=author
+        recipes = models.Recipe.objects.all()
+        recipes_limit = self.request.query_params.get("recipes_limit")
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.latest_per_author(int(recipes_limit))
+        return (
+            User.objects.filter(authors__subscriber=user)
+            .with_subscription(user)
+            .annotate(recipes_count=Count("own_recipes", distinct=True))
+            .prefetch_related(
+                Prefetch(
+                    "own_recipes", queryset=recipes, to_attr="latest_recipes"
+                )
+            )
         )
-        subscribe.delete()
+
+    def create(self, request, user_id):
+        author = get_object_or_404(User, pk=user_id)
+        if author == request.user:
+            raise ValidationError("Подписка на себя")
+        subscription = Subscriber.objects.add(request.user, author)
+        if subscription is None:
+            raise ValidationError({"detail": "Уже подписан"})
+        serializer = self.get_serializer(subscription)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, user_id):
+        if not Subscriber.objects.remove(request.user, user_id):
+            get_object_or_404(User, pk=user_id)
+            raise ValidationError({"detail": "Не подписан"})
         return Response(status=status.HTTP_204_NO_CONTENT)
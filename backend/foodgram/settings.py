@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +73,15 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "foodgram"),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,14 +103,52 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitPagination',
     'PAGE_SIZE': 6,
 
 }
 
+REFERENCE_CACHE_TIMEOUT = int(os.getenv("REFERENCE_CACHE_TIMEOUT", 3600))
+FEED_CACHE_TIMEOUT = int(os.getenv("FEED_CACHE_TIMEOUT", 300))
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", 300))
+# Версии данных в кэше. В локальном кэше у каждого процесса свои версии,
+# поэтому они живут ограниченное время, иначе изменение, сделанное в одном
+# процессе, в других не станет видно никогда.
+LOCAL_CACHE = CACHES["default"]["BACKEND"].endswith("LocMemCache")
+CACHE_VERSION_TIMEOUT = int(
+    os.getenv("CACHE_VERSION_TIMEOUT", 60 if LOCAL_CACHE else 0)
+) or None
+
+PROFILING_SAMPLE_RATE = float(
+    os.getenv("PROFILING_SAMPLE_RATE", 1.0 if DEBUG else 0.0)
+)
+PROFILING_SERVER_TIMING = (
+    os.getenv("PROFILING_SERVER_TIMING", str(DEBUG)) == "True"
+)
+PROFILING_DUPLICATE_THRESHOLD = int(
+    os.getenv("PROFILING_DUPLICATE_THRESHOLD", 3)
+)
+
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 20))
+INGREDIENT_INDEX_IN_MEMORY = (
+    os.getenv("INGREDIENT_INDEX_IN_MEMORY", "True") == "True"
+)
+INGREDIENT_INDEX_TTL = int(os.getenv("INGREDIENT_INDEX_TTL", 300))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LANGUAGE_CODE = 'ru-ru'
@@ -116,7 +164,10 @@ USE_TZ = True
 AUTH_USER_MODEL = "users.User"
 DJOSER = {
     "LOGIN_FIELD": "email",
-    "SERIALIZERS": {"user": "users.serializers.UserSerializer"},
+    "SERIALIZERS": {
+        "user": "users.serializers.UserSerializer",
+        "current_user": "users.serializers.UserSerializer",
+    },
     "HIDE_USERS": False,
     "PERMISSIONS": {
         "user": ["rest_framework.permissions.IsAuthenticated"],
@@ -130,3 +181,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+RECIPE_IMAGE_VARIANTS = {
+    "preview": (160, 160),
+    "card": (480, 480),
+    "detail": (1024, 1024),
+}
+RECIPE_UPLOAD_MAX_SIZE = int(os.getenv("RECIPE_UPLOAD_MAX_SIZE", 10 * 2 ** 20))
+RECIPE_IMAGE_QUALITY = int(os.getenv("RECIPE_IMAGE_QUALITY", 80))
+RECIPE_IMAGE_WORKERS = int(os.getenv("RECIPE_IMAGE_WORKERS", 2))
+
+BULK_RECIPES_MAX = int(os.getenv("BULK_RECIPES_MAX", 100))
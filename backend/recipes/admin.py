@@ -1,10 +1,12 @@
 from django.contrib import admin
 
 from . import models
+from .search import update_search_index
 
 
+@admin.register(models.Tag)
 class TagAdmin(admin.ModelAdmin):
-    list_display = ('name')
+    list_display = ("name", "slug", )
 
 
 @admin.register(models.Ingredient)
@@ -16,15 +18,33 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(models.Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ("name", "author", "get_favorite", )
+    list_display = ("name", "author", "favorites_count", )
     list_filter = ("author", "tags", )
+    list_select_related = ("author", )
+    readonly_fields = ("favorites_count", "carts_count", )
     search_fields = ("name", "author__username", "tags__name", )
 
-    def favorite(self, obj):
-        return obj.favorite.count()
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_index([form.instance.pk])
 
 
-admin.site.register(models.Tag, TagAdmin)
-admin.site.register(models.Recipe, RecipeAdmin)
-admin.site.register(models.Cart)
-admin.site.register(models.Favorite)
+@admin.register(models.Cart, models.Favorite)
+class UserRecipeAdmin(admin.ModelAdmin):
+    """Списки пользователей; счётчики рецептов пересчитываются после правки."""
+
+    def save_model(self, request, obj, form, change):
+        previous = form.initial.get("recipe")
+        super().save_model(request, obj, form, change)
+        models.Recipe.objects.filter(
+            pk__in=[obj.recipe_id, previous]
+        ).reconcile_counters()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        models.Recipe.objects.filter(pk=obj.recipe_id).reconcile_counters()
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list("recipe_id", flat=True))
+        super().delete_queryset(request, queryset)
+        models.Recipe.objects.filter(pk__in=recipe_ids).reconcile_counters()
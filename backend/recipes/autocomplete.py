@@ -0,0 +1,73 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import models as db_models
+
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный в памяти процесса список ингредиентов.
+
+    Поиск по префиксу — два bisect по ключам в нижнем регистре. Точное
+    совпадение всегда стоит первым: в сортировке строка идёт раньше
+    всех строк, для которых она является префиксом. Индекс сбрасывается
+    сигналами модели, а для изменений из других процессов — по TTL.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = None
+        self._items = None
+        self._built_at = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+            self._items = None
+
+    def _build(self):
+        items = sorted(
+            Ingredient.objects.only("id", "name", "measurement_unit"),
+            key=lambda item: (item.name.lower(), item.measurement_unit),
+        )
+        return [item.name.lower() for item in items], items
+
+    def _get(self):
+        with self._lock:
+            expired = time.monotonic() - self._built_at > self.ttl
+            if self._keys is None or expired:
+                self._keys, self._items = self._build()
+                self._built_at = time.monotonic()
+            return self._keys, self._items
+
+    def search(self, prefix, limit):
+        keys, items = self._get()
+        prefix = prefix.lower()
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + "\uffff", lo=start)
+        return items[start:min(end, start + limit)]
+
+
+ingredient_index = IngredientIndex(settings.INGREDIENT_INDEX_TTL)
+
+
+def search_ingredients(prefix, limit=None):
+    """Ингредиенты, название которых начинается с prefix."""
+    limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+    if settings.INGREDIENT_INDEX_IN_MEMORY:
+        return ingredient_index.search(prefix, limit)
+    return list(
+        Ingredient.objects.filter(name__istartswith=prefix)
+        .annotate(
+            exact=db_models.Case(
+                db_models.When(name__iexact=prefix, then=0),
+                default=1,
+                output_field=db_models.IntegerField(),
+            )
+        )
+        .order_by("exact", "name")[:limit]
+    )
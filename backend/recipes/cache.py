@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tag
+
+
+def version_key(model):
+    return f"version:{model._meta.label_lower}"
+
+
+def get_version(model):
+    """Версия данных модели — время последнего изменения в мс.
+
+    При ограниченном CACHE_VERSION_TIMEOUT истёкшая версия заводится заново,
+    так что процессы с локальным кэшем сходятся не позже этого срока.
+    """
+    version = cache.get(version_key(model))
+    if version is None:
+        cache.add(
+            version_key(model),
+            int(time.time() * 1000),
+            settings.CACHE_VERSION_TIMEOUT,
+        )
+        version = cache.get(version_key(model))
+    return version
+
+
+def bump_version(model):
+    current = cache.get(version_key(model)) or 0
+    cache.set(
+        version_key(model),
+        max(int(time.time() * 1000), current + 1),
+        settings.CACHE_VERSION_TIMEOUT,
+    )
+
+
+def tag_ids_by_slug():
+    """Словарь slug → id тегов, живёт до следующего изменения тегов."""
+    key = f"tag_ids:{get_version(Tag)}"
+    mapping = cache.get(key)
+    if mapping is None:
+        mapping = dict(Tag.objects.values_list("slug", "id"))
+        cache.set(key, mapping, settings.REFERENCE_CACHE_TIMEOUT)
+    return mapping
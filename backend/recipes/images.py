@@ -0,0 +1,84 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from .cache import bump_version
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix="recipe-images",
+)
+
+
+def variant_name(image_name, variant):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f"recipes/variants/{stem}_{variant}.webp"
+
+
+def variant_urls(recipe, request=None):
+    """Ссылки на копии картинки, до их готовности — на оригинал."""
+    if not recipe.image:
+        return None
+    if not recipe.image_variants_ready:
+        url = recipe.image.url
+        url = request.build_absolute_uri(url) if request else url
+        return dict.fromkeys(settings.RECIPE_IMAGE_VARIANTS, url)
+    variants = {}
+    for variant in settings.RECIPE_IMAGE_VARIANTS:
+        url = default_storage.url(variant_name(recipe.image.name, variant))
+        variants[variant] = request.build_absolute_uri(url) if request else url
+    return variants
+
+
+def generate_variants(recipe_id, image_name):
+    """Сохраняет уменьшенные WebP-копии картинки и отмечает рецепт."""
+    try:
+        with default_storage.open(image_name) as file:
+            original = Image.open(file)
+            original.load()
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA")
+        for variant, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            image = original.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, "WEBP", quality=settings.RECIPE_IMAGE_QUALITY)
+            name = variant_name(image_name, variant)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        if Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+            image_variants_ready=True
+        ):
+            bump_version(Recipe)
+    except Exception:
+        logger.exception("Не удалось обработать картинку %s", image_name)
+        return False
+    else:
+        return True
+
+
+def generate_in_background(recipe_id, image_name):
+    """generate_variants для потока пула: соединение потока закрывается."""
+    try:
+        return generate_variants(recipe_id, image_name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe):
+    """После коммита отдаёт картинку рецепта в фоновый пул."""
+    recipe_id, image_name = recipe.pk, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(generate_in_background, recipe_id, image_name)
+    )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Создание уменьшенных копий картинок рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересоздать копии и для уже обработанных рецептов",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(image_variants_ready=False)
+        processed = failed = 0
+        for recipe_id, image_name in recipes.values_list("pk", "image"):
+            if generate_variants(recipe_id, image_name):
+                processed += 1
+            else:
+                failed += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано картинок: {processed}, с ошибкой: {failed}"
+            )
+        )
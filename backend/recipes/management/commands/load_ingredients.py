@@ -0,0 +1,133 @@
+import csv
+import io
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.autocomplete import ingredient_index
+from recipes.cache import bump_version
+from recipes.models import Ingredient
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, "data", "ingredients.json")
+CHUNK_SIZE = 64 * 1024
+
+
+def read_json(path):
+    """Построчно отдаёт объекты из JSON-массива, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    with open(path, encoding="utf-8") as file:
+        while True:
+            buffer = buffer.lstrip(" \t\r\n,[")
+            if buffer.startswith("]") or (eof and not buffer):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    raise CommandError(f"Некорректный JSON в {path}")
+                chunk = file.read(CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            yield item["name"], item["measurement_unit"]
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            if len(row) < 2 or row[:2] == ["name", "measurement_unit"]:
+                continue
+            yield row[0], row[1]
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Загрузка ингредиентов из JSON или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Использовать COPY (только PostgreSQL)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"Файл {path} не найден")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size должен быть больше нуля")
+        use_copy = options["copy"] and connection.vendor == "postgresql"
+        if options["copy"] and not use_copy:
+            self.stderr.write("COPY недоступен, используется bulk_create")
+
+        reader = read_csv if path.endswith(".csv") else read_json
+        seen = set(
+            Ingredient.objects.values_list("name", "measurement_unit")
+        )
+        start = time.monotonic()
+        created = 0
+        for batch in batches(
+            self.unique(reader(path), seen), options["batch_size"]
+        ):
+            with transaction.atomic():
+                if use_copy:
+                    self.copy(batch)
+                else:
+                    Ingredient.objects.bulk_create(
+                        (
+                            Ingredient(name=name, measurement_unit=unit)
+                            for name, unit in batch
+                        ),
+                        ignore_conflicts=True,
+                    )
+            created += len(batch)
+        ingredient_index.invalidate()
+        bump_version(Ingredient)
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено {created} ингредиентов за {elapsed:.2f} с "
+                f"({created / elapsed if elapsed else created:.0f} строк/с)"
+            )
+        )
+
+    @staticmethod
+    def unique(rows, seen):
+        for name, unit in rows:
+            name, unit = name.strip(), unit.strip()
+            if (name, unit) in seen:
+                continue
+            seen.add((name, unit))
+            yield name, unit
+
+    @staticmethod
+    def copy(batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Ingredient._meta.db_table} (name, measurement_unit) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
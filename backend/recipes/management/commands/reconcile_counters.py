@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Пересчёт счётчиков избранного и корзин у рецептов"
+
+    def handle(self, *args, **options):
+        updated = Recipe.objects.reconcile_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитано рецептов: {updated}")
+        )
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+def create_upper_prefix_index(apps, schema_editor):
+    # istartswith на PostgreSQL превращается в UPPER(name) LIKE 'X%'
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX ingredient_name_upper_prefix_idx '
+            'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+        )
+
+
+def drop_upper_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS ingredient_name_upper_prefix_idx'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ('name',), 'verbose_name': 'Ингредиенты'},
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='ingredient_name_prefix_idx', opclasses=('varchar_pattern_ops',)),
+        ),
+        migrations.RunPython(
+            create_upper_prefix_index, drop_upper_prefix_index
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:50
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model):
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(recipe=models.OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(total=models.Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(
+        favorites_count=count_subquery(apps.get_model('recipes', 'Favorite')),
+        carts_count=count_subquery(apps.get_model('recipes', 'Cart')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_ingredient_name_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
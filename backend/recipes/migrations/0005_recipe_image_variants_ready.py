@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Уменьшенные копии готовы'),
+        ),
+    ]
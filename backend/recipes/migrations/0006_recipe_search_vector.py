@@ -0,0 +1,68 @@
+# Generated by Django 2.2.19 on 2026-10-18 21:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRESQL_INDEX = (
+    "CREATE INDEX recipe_search_vector_idx "
+    "ON recipes_recipe USING gin (search_vector)"
+)
+POSTGRESQL_FILL = """
+UPDATE recipes_recipe r SET search_vector =
+    setweight(to_tsvector('russian', coalesce(r.name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce((
+        SELECT string_agg(i.name, ' ')
+        FROM recipes_recipeingredients ri
+        JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id
+    ), '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(r.text, '')), 'C')
+"""
+SQLITE_TABLE = (
+    "CREATE VIRTUAL TABLE recipes_recipe_fts "
+    "USING fts5(name, ingredients, text)"
+)
+SQLITE_FILL = """
+INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text)
+SELECT r.id, r.name, coalesce((
+    SELECT group_concat(i.name, ' ')
+    FROM recipes_recipeingredients ri
+    JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+    WHERE ri.recipe_id = r.id
+), ''), r.text
+FROM recipes_recipe r
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_INDEX)
+        schema_editor.execute(POSTGRESQL_FILL)
+    elif vendor == 'sqlite':
+        schema_editor.execute(SQLITE_TABLE)
+        schema_editor.execute(SQLITE_FILL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipes_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_variants_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.19 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        # Автоматическая таблица тегов индексирована по (recipe_id, tag_id);
+        # фильтр по тегам идёт от tag_id и читает только этот индекс.
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipe_tags_tag_recipe_idx',
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 2.2.19 on 2026-10-18 22:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(model, *fields):
+    """Оставляет по одной строке на каждое сочетание fields."""
+    keep = (
+        model.objects.order_by()
+        .values(*fields)
+        .annotate(keep=Min('id'))
+        .values('keep')
+    )
+    return model.objects.exclude(id__in=keep).delete()[0]
+
+
+def merge_amounts(model):
+    """Складывает количество повторных строк рецепта в оставляемую."""
+    groups = (
+        model.objects.order_by()
+        .values('recipe', 'ingredient')
+        .annotate(keep=Min('id'), total=Sum('amount'), lines=Count('id'))
+        .filter(lines__gt=1)
+    )
+    for group in groups:
+        model.objects.filter(id=group['keep']).update(
+            amount=group['total']
+        )
+
+
+def count_for_recipe(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def deduplicate(apps, schema_editor):
+    # Ограничения раньше не создавались, дубли могли накопиться
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    Cart = apps.get_model('recipes', 'Cart')
+
+    keep, duplicates = {}, []
+    for pk, name, unit in Ingredient.objects.order_by('id').values_list(
+        'id', 'name', 'measurement_unit'
+    ):
+        original = keep.setdefault((name, unit), pk)
+        if original != pk:
+            RecipeIngredients.objects.filter(ingredient_id=pk).update(
+                ingredient_id=original
+            )
+            duplicates.append(pk)
+    Ingredient.objects.filter(id__in=duplicates).delete()
+    merge_amounts(RecipeIngredients)
+    remove_duplicates(RecipeIngredients, 'recipe', 'ingredient')
+
+    removed = remove_duplicates(Favorite, 'user', 'recipe')
+    removed += remove_duplicates(Cart, 'user', 'recipe')
+    if removed:
+        Recipe.objects.update(
+            favorites_count=count_for_recipe(Favorite),
+            carts_count=count_for_recipe(Cart),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_tags_tag_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_cart'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredients',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
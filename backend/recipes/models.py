@@ -1,7 +1,9 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Coalesce, Greatest
 
 User = get_user_model()
 
@@ -26,20 +28,166 @@ class Ingredient(models.Model):
 
     name = models.CharField("Название", max_length=100)
     measurement_unit = models.CharField("Ед. измерения", max_length=100)
-    constraints = (
-        models.UniqueConstraint(
-            fields=("name", "measurement_unit"),
-            name="unique_ingredient",
-        )
-    )
 
     class Meta:
         verbose_name = "Ингредиенты"
+        ordering = ("name", )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("name", ),
+                name="ingredient_name_prefix_idx",
+                opclasses=("varchar_pattern_ops", ),
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
+def count_subquery(model, **filters):
+    """Число строк model, ссылающихся на рецепт из внешнего запроса."""
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(recipe=models.OuterRef("pk"), **filters)
+            .order_by()
+            .values("recipe")
+            .annotate(total=models.Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов"""
+
+    def for_feed(self, user):
+        """Рецепты со всеми связями и флагами пользователя для ленты."""
+        queryset = self.prefetch_related(
+            models.Prefetch(
+                "author", queryset=User.objects.with_subscription(user)
+            ),
+            "tags",
+            models.Prefetch(
+                "ingredientsamount",
+                queryset=RecipeIngredients.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+        return queryset.with_user_flags(user)
+
+    def with_user_flags(self, user):
+        """Добавляет is_favorited и is_in_shopping_cart для user."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                Cart.objects.filter(user=user, recipe=models.OuterRef("pk"))
+            ),
+        )
+
+    def shift_counter(self, field, delta):
+        """Атомарно сдвигает счётчик рецептов на delta через F().
+
+        Строки, добавленные в обход API, счётчик не увеличивают, поэтому
+        ниже нуля он не опускается.
+        """
+        return self.update(**{field: Greatest(models.F(field) + delta, 0)})
+
+    def reconcile_counters(self):
+        """Пересчитывает favorites_count и carts_count по таблицам связей."""
+        return self.update(
+            favorites_count=count_subquery(Favorite),
+            carts_count=count_subquery(Cart),
+        )
+
+    def cookable(self, ingredient_ids, missing=0):
+        """Рецепты, где есть хоть один из ingredient_ids и не хватает
+        не более missing ингредиентов, с долей имеющихся в coverage."""
+        ingredient_ids = list(ingredient_ids)
+        return self.filter(
+            pk__in=RecipeIngredients.objects.filter(
+                ingredient__in=ingredient_ids
+            ).values("recipe")
+        ).annotate(
+            ingredients_total=count_subquery(RecipeIngredients),
+            ingredients_matched=count_subquery(
+                RecipeIngredients, ingredient__in=ingredient_ids
+            ),
+            missing_count=(
+                models.F("ingredients_total")
+                - models.F("ingredients_matched")
+            ),
+            coverage=models.ExpressionWrapper(
+                Cast("ingredients_matched", models.FloatField())
+                / models.F("ingredients_total"),
+                output_field=models.FloatField(),
+            ),
+        ).filter(missing_count__lte=missing)
+
+    def latest_per_author(self, limit):
+        """Не более limit последних рецептов каждого автора."""
+        latest = self.model.objects.filter(
+            author=models.OuterRef("author")
+        ).order_by("-create_date", "-id").values("pk")[:limit]
+        return self.filter(pk__in=models.Subquery(latest))
+
+
+class UserRecipeQuerySet(models.QuerySet):
+    """Списки рецептов пользователя: избранное и корзина"""
+
+    def add(self, user, recipe):
+        """Добавляет рецепт одним INSERT, None — если он уже в списке."""
+        try:
+            with transaction.atomic():
+                return self.create(user=user, recipe=recipe)
+        except IntegrityError:
+            return None
+
+    def remove(self, user, recipe_id):
+        """Убирает рецепт одним DELETE, возвращает число удалённых строк."""
+        return self.filter(user=user, recipe_id=recipe_id).delete()[0]
+
+    def add_many(self, user, recipe_ids):
+        """Добавляет рецепты одним INSERT, уже добавленные пропускает."""
+        self.bulk_create(
+            [self.model(user=user, recipe_id=pk) for pk in recipe_ids],
+            ignore_conflicts=True,
+        )
+
+    def remove_many(self, user, recipe_ids=None):
+        """Убирает рецепты recipe_ids, а без них — все рецепты списка.
+
+        Возвращает id рецептов, которые действительно были в списке.
+        """
+        queryset = self.filter(user=user)
+        if recipe_ids is not None:
+            queryset = queryset.filter(recipe_id__in=recipe_ids)
+        removed = list(queryset.values_list("recipe_id", flat=True))
+        if removed:
+            self.filter(user=user, recipe_id__in=removed).delete()
+        return removed
+
+
 class Recipe(models.Model):
     """Рецепт"""
 
@@ -71,10 +219,37 @@ class Recipe(models.Model):
         through="Favorite",
         related_name="recipes"
     )
+    favorites_count = models.PositiveIntegerField(
+        "В избранном", default=0, editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        "В корзинах", default=0, editable=False
+    )
+    image_variants_ready = models.BooleanField(
+        "Уменьшенные копии готовы", default=False, editable=False
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         ordering = ("-create_date", )
+        indexes = (
+            models.Index(
+                fields=("-create_date", "-id"), name="recipe_create_date_idx"
+            ),
+            models.Index(
+                fields=("-favorites_count", "-id"), name="recipe_favorites_idx"
+            ),
+            models.Index(
+                fields=("cooking_time", "id"), name="recipe_cooking_time_idx"
+            ),
+            models.Index(
+                fields=("author", "-create_date"),
+                name="recipe_author_date_idx",
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -93,15 +268,18 @@ class Favorite(models.Model):
         related_name="favorite_recipes",
         on_delete=models.CASCADE
     )
-    constraints = (
-        models.UniqueConstraint(
-            fields=("recipe", "user"),
-            name="unique_favorite",
-        )
-    )
+
+    objects = UserRecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Избранный рецепт"
+        # user первым: тот же индекс отвечает на «моё избранное»
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_favorite",
+            ),
+        )
 
     def __str__(self):
         return f"{self.recipe} - {self.user}"
@@ -111,7 +289,7 @@ class RecipeIngredients(models.Model):
     """Ингредиенты рецепта"""
 
     recipe = models.ForeignKey(
-        Recipe, related_name="amount", on_delete=models.CASCADE
+        Recipe, related_name="ingredientsamount", on_delete=models.CASCADE
     )
     ingredient = models.ForeignKey(
         Ingredient,
@@ -122,15 +300,15 @@ class RecipeIngredients(models.Model):
         "Количество",
         validators=[MinValueValidator(1)]
     )  # Не менее единицы измерения
-    constraints = (
-        models.UniqueConstraint(
-            fields=("recipe", "ingredient"),
-            name="unique_ingredient",
-        )
-    )
 
     class Meta:
         verbose_name = "Ингредиент рецепта"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "ingredient"),
+                name="unique_recipe_ingredient",
+            ),
+        )
 
     def __str__(self):
         return (
@@ -152,15 +330,18 @@ class Cart(models.Model):
         related_name="cart",
         on_delete=models.CASCADE
     )
-    constraints = (
-        models.UniqueConstraint(
-            name="unique_cart",
-            fields=("recipe", "user"),
-        )
-    )
+
+    objects = UserRecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Список покупок"
+        # user первым: тот же индекс отвечает на «мою корзину»
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_cart",
+            ),
+        )
 
     def __str__(self):
         return f"Всё для{self.recipe} в корзине"
@@ -0,0 +1,115 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection, models
+
+from .models import Recipe, RecipeIngredients
+
+SEARCH_CONFIG = "russian"
+FTS_TABLE = "recipes_recipe_fts"
+
+
+def ingredient_names():
+    """Названия ингредиентов рецепта из внешнего запроса одной строкой."""
+    from django.contrib.postgres.aggregates import StringAgg
+
+    return models.Subquery(
+        RecipeIngredients.objects.filter(recipe=models.OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(names=StringAgg("ingredient__name", " "))
+        .values("names"),
+        output_field=models.TextField(),
+    )
+
+
+def update_search_index(recipe_ids):
+    """Пересобирает поисковый индекс для рецептов recipe_ids."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    if connection.vendor == "postgresql":
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=(
+                SearchVector("name", weight="A", config=SEARCH_CONFIG)
+                + SearchVector(
+                    ingredient_names(), weight="B", config=SEARCH_CONFIG
+                )
+                + SearchVector("text", weight="C", config=SEARCH_CONFIG)
+            )
+        )
+    elif connection.vendor == "sqlite":
+        update_fts(recipe_ids)
+
+
+def update_fts(recipe_ids):
+    names = {}
+    for recipe_id, name in RecipeIngredients.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list("recipe_id", "ingredient__name"):
+        names.setdefault(recipe_id, []).append(name)
+    rows = [
+        (pk, name, " ".join(names.get(pk, [])), text)
+        for pk, name, text in Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list("pk", "name", "text")
+    ]
+    placeholders = ", ".join(["%s"] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+            recipe_ids,
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) "
+            "VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под query, с релевантностью в search_rank.
+
+    На PostgreSQL — хранимый tsvector с русской морфологией, на SQLite —
+    FTS5 с поиском по началу слов, на прочих базах — icontains.
+    """
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return queryset.annotate(
+            search_rank=SearchRank(models.F("search_vector"), search_query)
+        ).filter(search_vector=search_query)
+    if connection.vendor == "sqlite":
+        return search_fts(queryset, query)
+    return queryset.filter(
+        models.Q(name__icontains=query) | models.Q(text__icontains=query)
+    ).annotate(search_rank=models.Value(0.0, models.FloatField()))
+
+
+def search_fts(queryset, query):
+    words = [word.replace('"', "") for word in query.split()]
+    match = " ".join(f'"{word}"*' for word in words if word)
+    ranks = {}
+    if match:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [match],
+            )
+            ranks = dict(cursor.fetchall())
+    if not ranks:
+        # пустой результат всё равно должен уметь сортироваться по рангу
+        return queryset.annotate(
+            search_rank=models.Value(0.0, models.FloatField())
+        ).none()
+    return queryset.filter(pk__in=ranks).annotate(
+        search_rank=models.Case(
+            *[
+                models.When(pk=pk, then=models.Value(rank))
+                for pk, rank in ranks.items()
+            ],
+            output_field=models.FloatField(),
+        )
+    )
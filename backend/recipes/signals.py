@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import ingredient_index
+from .cache import bump_version
+from .models import Ingredient, Recipe, RecipeIngredients, Tag
+from .search import update_search_index
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def bump_reference_version(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(instance, created, **kwargs):
+    if created:
+        return
+    update_search_index(
+        RecipeIngredients.objects.filter(ingredient=instance)
+        .values_list("recipe_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_feed_version(**kwargs):
+    # после коммита, иначе ленту успеют закэшировать по старым данным
+    transaction.on_commit(lambda: bump_version(Recipe))
+
+
+@receiver(post_save, sender=User)
+def bump_feed_version_for_author(update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(lambda: bump_version(Recipe))
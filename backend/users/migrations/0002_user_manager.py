@@ -0,0 +1,28 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:49
+
+from django.db import migrations
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='subscriber',
+            options={'ordering': ('id',), 'verbose_name': 'Подписка'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'ordering': ('id',), 'verbose_name': 'Пользователь'},
+        ),
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.UserManager()),
+            ],
+        ),
+    ]
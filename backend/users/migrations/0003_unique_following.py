@@ -0,0 +1,30 @@
+# Generated by Django 2.2.19 on 2026-10-18 22:05
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    Subscriber = apps.get_model('users', 'Subscriber')
+    keep = (
+        Subscriber.objects.order_by()
+        .values('subscriber', 'author')
+        .annotate(keep=Min('id'))
+        .values('keep')
+    )
+    Subscriber.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_manager'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='subscriber',
+            constraint=models.UniqueConstraint(fields=('subscriber', 'author'), name='unique_following'),
+        ),
+    ]
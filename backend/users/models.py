@@ -1,5 +1,30 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import UserManager as BaseUserManager
+from django.db import IntegrityError, models, transaction
+
+
+class UserQuerySet(models.QuerySet):
+    """Выборки пользователей"""
+
+    def with_subscription(self, user):
+        """Добавляет is_subscribed: подписан ли user на пользователя."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_subscribed=models.Value(
+                    False, output_field=models.BooleanField()
+                )
+            )
+        return self.annotate(
+            is_subscribed=models.Exists(
+                Subscriber.objects.filter(
+                    subscriber=user, author=models.OuterRef("pk")
+                )
+            )
+        )
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -12,13 +37,34 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
 
+    objects = UserManager()
+
     class Meta:
         verbose_name = "Пользователь"
+        ordering = ("id", )
 
     def __str__(self):
         return self.username
 
 
+class SubscriberQuerySet(models.QuerySet):
+    """Подписки"""
+
+    def add(self, subscriber, author):
+        """Подписывает одним INSERT, None — если подписка уже есть."""
+        try:
+            with transaction.atomic():
+                return self.create(subscriber=subscriber, author=author)
+        except IntegrityError:
+            return None
+
+    def remove(self, subscriber, author_id):
+        """Отписывает одним DELETE, возвращает число удалённых строк."""
+        return self.filter(
+            subscriber=subscriber, author_id=author_id
+        ).delete()[0]
+
+
 class Subscriber(models.Model):
     """Сферический подписчик"""
 
@@ -34,16 +80,18 @@ class Subscriber(models.Model):
         related_name="authors",
         on_delete=models.CASCADE,
     )
-    constraints = (
-        models.UniqueConstraint(
-            fields=("subscriber", "author"),
-            name="unique_following",
-        )
-    )
+
+    objects = SubscriberQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Подписка"
         ordering = ("id", )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("subscriber", "author"),
+                name="unique_following",
+            ),
+        )
 
     def __str__(self):
         return f"{self.subscriber} подписан на {self.author}"
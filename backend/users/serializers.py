@@ -20,6 +20,8 @@ class UserSerializer(BaseUserSerializer):
         model = User
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
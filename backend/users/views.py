@@ -0,0 +1,7 @@
+from djoser.views import UserViewSet as BaseUserViewSet
+
+
+class UserViewSet(BaseUserViewSet):
+
+    def get_queryset(self):
+        return super().get_queryset().with_subscription(self.request.user)